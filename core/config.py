@@ -1,58 +1,269 @@
 # -*- coding: utf-8 -*-
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from pymongo import UpdateOne
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import secrets
+import time
 import os
 
-# Generate a key with: Fernet.generate_key().decode()
+# Snapshot of the process environment, taken once at import.
+_ENV: Dict[str, str] = dict(os.environ)
+
+class Settings:
+    """Application settings, read once from the environment snapshot."""
+
+    def __init__(self, env: Dict[str, str] = _ENV):
+        self.MONGO_URI: str = env.get("MONGO_URI", "mongodb://localhost:27017")
+        self.DB_NAME: str = env.get("DB_NAME", "saino_ai")
+        self.ALGORITHM: str = env.get("ALGORITHM", "HS256")
+        self.ACCESS_TOKEN_EXPIRE_MINUTES: int = int(env.get("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+        self.DEBUG: bool = env.get("DEBUG", "false").strip().lower() in ("1", "true", "yes", "on")
+        self.LOG_LEVEL: str = env.get("LOG_LEVEL", "DEBUG" if self.DEBUG else "INFO")
+
+        # JWTs are signed with this key, so a well-known default would make tokens forgeable.
+        secret_key = env.get("SECRET_KEY")
+        if not secret_key:
+            if not self.DEBUG:
+                raise RuntimeError("SECRET_KEY environment variable is not set.")
+            # Debug only: a random per-process key; tokens won't survive a restart.
+            secret_key = secrets.token_urlsafe(32)
+        self.SECRET_KEY: str = secret_key
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
+
+settings = get_settings()
+
+logger = logging.getLogger("saino")
+
+# Generate a key with: Fernet.generate_key().decode() (32 random bytes, urlsafe base64)
 # Store this securely, NOT in the code. Read from environment.
-ENCRYPTION_KEY = os.getenv("DB_ENCRYPTION_KEY", "your-32-byte-fernet-key-for-db-encryption")
-cipher_suite = Fernet(ENCRYPTION_KEY.encode())
+ENCRYPTION_KEY = _ENV.get("DB_ENCRYPTION_KEY")
+
+def _decode_encryption_key(key: Optional[str]) -> bytes:
+    """Decodes DB_ENCRYPTION_KEY, refusing anything but 32 url-safe base64 bytes (the Fernet key format)."""
+    if not key:
+        raise RuntimeError("DB_ENCRYPTION_KEY environment variable is not set.")
+    try:
+        raw = base64.urlsafe_b64decode(key.encode())
+    except (binascii.Error, ValueError):
+        raise RuntimeError("DB_ENCRYPTION_KEY must be 32 url-safe base64-encoded bytes.") from None
+    if len(raw) != 32:
+        raise RuntimeError("DB_ENCRYPTION_KEY must be 32 url-safe base64-encoded bytes.")
+    return raw
+
+# Validated at import, so a missing or weak key stops startup instead of encrypting data under it.
+_MASTER_KEY = _decode_encryption_key(ENCRYPTION_KEY)
+
+_NONCE_SIZE = 12
+
+@lru_cache(maxsize=None)
+def _derive_key(purpose: bytes) -> bytes:
+    """
+    Derives a 32-byte subkey for one purpose from DB_ENCRYPTION_KEY with HKDF-SHA256,
+    so the encryption and fingerprint keys are independent of each other and of the secret.
+    """
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"saino-api-keys:" + purpose).derive(_MASTER_KEY)
+
+@lru_cache(maxsize=1)
+def get_cipher_suite() -> AESGCM:
+    """Returns the process-wide AES-256-GCM cipher, built once on first use."""
+    return AESGCM(_derive_key(b"aead"))
+
+@lru_cache(maxsize=1)
+def _get_legacy_cipher_suite() -> Fernet:
+    """Fernet cipher, only used to read keys written before the switch to AES-GCM."""
+    return Fernet(ENCRYPTION_KEY.encode())
+
+def _associated_data(owner_id: str, service: str) -> bytes:
+    """Binds a ciphertext to its row, so it can't be copied to another owner or service."""
+    return f"{owner_id}\x00{service}".encode()
+
+@lru_cache(maxsize=512)
+def _decrypt_cached(nonce: bytes, ciphertext: bytes, associated_data: bytes) -> str:
+    """Decrypts a ciphertext, memoized so repeated lookups skip the AES work."""
+    return get_cipher_suite().decrypt(nonce, ciphertext, associated_data).decode()
 
 class EnvManager:
     """Manages dynamic, user-specific, and system-wide API keys stored securely in the database."""
-    
+
+    # Decrypted keys cached per (user_id, service) as (value, fetched_at), least recently used first.
+    KEY_CACHE_TTL: float = 60.0
+    KEY_CACHE_MAX_ENTRIES: int = 1024
+    _key_cache: "OrderedDict[Tuple[str, str], Tuple[Optional[str], float]]" = OrderedDict()
+    # Lookups currently hitting the database, shared by concurrent callers; removed once done.
+    _key_fetches: Dict[Tuple[str, str], asyncio.Future] = {}
+    # Bumped on every write to a service, so fetches that raced with the write are not cached.
+    _key_generations: Dict[str, int] = {}
+
     def __init__(self, db, user_id: str):
         self.db = db
         self.user_id = user_id
         self.keys_collection = self.db["api_keys"]
 
-    def _encrypt(self, value: str) -> str:
-        return cipher_suite.encrypt(value.encode()).decode()
+    @staticmethod
+    async def ensure_indexes(db):
+        """Creates the compound index used by key lookups. Safe to call on every startup."""
+        # Unique, so concurrent first-time writes of the same key can't create two rows.
+        await db["api_keys"].create_index([("owner_id", 1), ("service", 1)], unique=True)
 
-    def _decrypt(self, value: str) -> str:
-        return cipher_suite.decrypt(value.encode()).decode()
+    def _encrypt(self, owner_id: str, service: str, value: str) -> Dict[str, bytes]:
+        """Encrypts a key into the document fields it is stored under (raw bytes, stored as BSON binary)."""
+        nonce = os.urandom(_NONCE_SIZE)
+        ciphertext = get_cipher_suite().encrypt(nonce, value.encode(), _associated_data(owner_id, service))
+        return {"nonce": nonce, "ct": ciphertext}
 
-    async def set_key(self, service: str, value: str, is_system_key: bool = False):
-        """Sets or updates an API key for a service."""
-        owner_id = "system" if is_system_key else self.user_id
-        encrypted_value = self._encrypt(value)
-        await self.keys_collection.update_one(
+    def _decrypt(self, key_doc: Dict) -> str:
+        """Decrypts the key stored in a document, including legacy Fernet-encrypted ones."""
+        if "ct" in key_doc:
+            associated_data = _associated_data(key_doc["owner_id"], key_doc["service"])
+            return _decrypt_cached(key_doc["nonce"], key_doc["ct"], associated_data)
+        return _get_legacy_cipher_suite().decrypt(key_doc["value"]).decode()
+
+    def _fingerprint(self, value: str) -> str:
+        """Keyed hash of a plaintext key, stored alongside it to detect unchanged writes server-side."""
+        return hmac.new(_derive_key(b"fingerprint"), value.encode(), hashlib.sha256).hexdigest()
+
+    def _write_specs(self, owner_id: str, service: str, value: str) -> Tuple[Tuple[Dict, Dict], Tuple[Dict, Dict]]:
+        """
+        Filter/update pairs for writing a key without rewriting an unchanged value:
+        the first updates an existing row only if its fingerprint differs, the second
+        inserts the row only if it doesn't exist yet.
+        """
+        fingerprint = self._fingerprint(value)
+        fields = {**self._encrypt(owner_id, service, value), "hmac": fingerprint}
+        update_changed = (
+            {"owner_id": owner_id, "service": service, "hmac": {"$ne": fingerprint}},
+            {"$set": fields, "$unset": {"value": ""}}
+        )
+        insert_missing = (
             {"owner_id": owner_id, "service": service},
-            {"$set": {"value": encrypted_value}},
-            upsert=True
+            {"$setOnInsert": fields}
         )
+        return update_changed, insert_missing
+
+    async def set_key(self, service: str, value: str, is_system_key: bool = False):
+        """Sets or updates an API key for a service. Nothing is written if the value is unchanged."""
+        owner_id = "system" if is_system_key else self.user_id
+        update_changed, insert_missing = self._write_specs(owner_id, service, value)
+        result = await self.keys_collection.update_one(*update_changed)
+        if result.matched_count == 0:
+            result = await self.keys_collection.update_one(*insert_missing, upsert=True)
+            if result.upserted_id is None:
+                # The row exists and already holds this value.
+                return
+        self._invalidate(service, owner_id)
+
+    async def set_keys(self, keys: Dict[str, str], is_system_key: bool = False):
+        """Sets or updates several API keys at once, in a single bulk write."""
+        if not keys:
+            return
+        owner_id = "system" if is_system_key else self.user_id
+        # Both operations of each pair are safe in either order: an existing row is only
+        # touched by the update, a missing one only by the insert.
+        operations = []
+        for service, value in keys.items():
+            update_changed, insert_missing = self._write_specs(owner_id, service, value)
+            operations.append(UpdateOne(*update_changed))
+            operations.append(UpdateOne(*insert_missing, upsert=True))
+        await self.keys_collection.bulk_write(operations, ordered=False)
+        for service in keys:
+            self._invalidate(service, owner_id)
+
+    @classmethod
+    def _invalidate(cls, service: str, owner_id: str):
+        """Drops cached values and in-flight lookups affected by a write to (owner_id, service)."""
+        cls._key_generations[service] = cls._key_generations.get(service, 0) + 1
+        if owner_id == "system":
+            # A system key is the fallback for every user.
+            affected = [k for k in cls._key_cache if k[1] == service]
+            affected += [k for k in cls._key_fetches if k[1] == service]
+        else:
+            affected = [(owner_id, service)]
+        for cache_key in affected:
+            cls._key_cache.pop(cache_key, None)
+            cls._key_fetches.pop(cache_key, None)
+
+    @classmethod
+    def _cache_lookup(cls, cache_key: Tuple[str, str]) -> Optional[Tuple[Optional[str], float]]:
+        cached = cls._key_cache.get(cache_key)
+        if cached is None:
+            return None
+        if time.monotonic() - cached[1] >= cls.KEY_CACHE_TTL:
+            cls._key_cache.pop(cache_key, None)
+            return None
+        cls._key_cache.move_to_end(cache_key)
+        return cached
+
+    @classmethod
+    def _cache_store(cls, cache_key: Tuple[str, str], value: Optional[str]):
+        cls._key_cache[cache_key] = (value, time.monotonic())
+        cls._key_cache.move_to_end(cache_key)
+        while len(cls._key_cache) > cls.KEY_CACHE_MAX_ENTRIES:
+            cls._key_cache.popitem(last=False)
 
     async def get_key(self, service: str) -> Optional[str]:
         """Gets a user's key, falling back to the system key if not found."""
-        # Try user-specific key first
-        user_key = await self.keys_collection.find_one({"owner_id": self.user_id, "service": service})
-        if user_key:
-            return self._decrypt(user_key["value"])
-        
-        # Fallback to system key
-        system_key = await self.keys_collection.find_one({"owner_id": "system", "service": service})
-        if system_key:
-            return self._decrypt(system_key["value"])
-            
+        cache_key = (self.user_id, service)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            return cached[0]
+
+        # Concurrent misses for the same key share a single database fetch.
+        fetch = self._key_fetches.get(cache_key)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._fetch_and_cache(cache_key, service))
+            self._key_fetches[cache_key] = fetch
+
+            def _forget(done: asyncio.Future):
+                if self._key_fetches.get(cache_key) is done:
+                    del self._key_fetches[cache_key]
+
+            fetch.add_done_callback(_forget)
+        return await asyncio.shield(fetch)
+
+    async def _fetch_and_cache(self, cache_key: Tuple[str, str], service: str) -> Optional[str]:
+        generation = self._key_generations.get(service, 0)
+        value = await self._fetch_key(service)
+        # A write during the fetch may have made this value stale; serve it once but don't cache it.
+        if self._key_generations.get(service, 0) == generation:
+            self._cache_store(cache_key, value)
+        return value
+
+    async def _fetch_key(self, service: str) -> Optional[str]:
+        # Fetch both candidates in one round-trip; the user-specific key wins.
+        cursor = self.keys_collection.find(
+            {"owner_id": {"$in": [self.user_id, "system"]}, "service": service},
+            {"owner_id": 1, "service": 1, "nonce": 1, "ct": 1, "value": 1}
+        )
+        fallback = None
+        async for key_doc in cursor:
+            if key_doc["owner_id"] == self.user_id:
+                return self._decrypt(key_doc)
+            fallback = key_doc
+
+        if fallback:
+            return self._decrypt(fallback)
+
         return None
 
     async def get_all_user_keys(self) -> List[Dict]:
         """Lists all services for which the user has set a key."""
-        keys_cursor = self.keys_collection.find({"owner_id": self.user_id})
-        user_keys = []
-        async for key_doc in keys_cursor:
-            user_keys.append({
-                "service": key_doc["service"],
-                "is_set": True
-            })
-        return user_keys
+        # Only the service name is needed; leave the ciphertext on the server.
+        key_docs = await self.keys_collection.find(
+            {"owner_id": self.user_id},
+            {"service": 1, "_id": 0}
+        ).to_list(length=None)
+        return [{"service": key_doc["service"], "is_set": True} for key_doc in key_docs]
@@ -1,38 +1,69 @@
 # -*- coding: utf-8 -*-
 from motor.motor_asyncio import AsyncIOMotorClient
-from .config import settings, logger
+from pymongo.errors import OperationFailure
+from functools import lru_cache
+import asyncio
+from .config import settings, logger, EnvManager
 import backoff
 
+@lru_cache(maxsize=1)
+def _get_client() -> AsyncIOMotorClient:
+    """Returns the process-wide Motor client so every caller shares one connection pool."""
+    return AsyncIOMotorClient(
+        settings.MONGO_URI,
+        serverSelectionTimeoutMS=5000,
+        maxPoolSize=200,
+        minPoolSize=10,
+        maxIdleTimeMS=300_000,
+        waitQueueTimeoutMS=2500,
+        compressors="zstd,snappy",  # Unavailable compressors are skipped by the driver.
+        retryWrites=True
+    )
+
 class DatabaseManager:
     """
     Manages the connection to the MongoDB database.
     Handles connection, disconnection, and provides access to the database object.
+    The underlying client is shared process-wide, whatever the number of instances.
     """
-    _client: AsyncIOMotorClient | None = None
     _db = None
 
-    @backoff.on_exception(backoff.expo, Exception, max_tries=5)
+    # Server-side failures (auth, index build) won't fix themselves; only retry connectivity errors.
+    @backoff.on_exception(backoff.expo, Exception, max_tries=5,
+                          giveup=lambda e: isinstance(e, OperationFailure))
     async def connect_to_database(self):
-        if self._client and self._db:
+        if DatabaseManager._db is not None:
             logger.info("Database connection already established.")
             return
         
         logger.info("Connecting to MongoDB...")
-        self._client = AsyncIOMotorClient(
-            settings.MONGO_URI,
-            serverSelectionTimeoutMS=5000
-        )
+        client = _get_client()
         try:
-            await self._client.admin.command('ping')
-            self._db = self._client[settings.DB_NAME]
+            await client.admin.command('ping')
+            db = client[settings.DB_NAME]
+            await EnvManager.ensure_indexes(db)
+            await self._warmup_pool(db)
+            # Only publish the handle once the indexes exist, so a failed attempt is retried in full.
+            DatabaseManager._db = db
             logger.info("✅ Successfully connected to MongoDB.")
         except Exception as e:
             logger.error(f"❌ Failed to connect to MongoDB: {e}")
             raise
 
+    async def _warmup_pool(self, db, connections: int = 5):
+        """Opens a few sockets up front so the first requests don't pay the connect cost."""
+        try:
+            await asyncio.gather(*(
+                db["api_keys"].find_one({}, {"_id": 1}) for _ in range(connections)
+            ))
+        except Exception as e:
+            logger.warning(f"MongoDB pool warmup failed: {e}")
+
     async def close_database_connection(self):
-        if self._client:
-            self._client.close()
+        if _get_client.cache_info().currsize:
+            _get_client().close()
+            _get_client.cache_clear()
+            DatabaseManager._db = None
             logger.info("MongoDB connection closed.")
 
     @property
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 from pathlib import Path
-import importlib.util
+import importlib
 import sys
-from .config import logger
-from typing import Dict, Type
+from .config import logger, settings
+from typing import Dict, Tuple, Type
 
 class ToolManager:
     """
@@ -16,6 +16,8 @@ class ToolManager:
         # this class just triggers the loading process.
         from tools.base import BaseTool
         self.registry: Dict[str, Type[BaseTool]] = BaseTool.registry
+        # Modification time of each tool file when it was last imported.
+        self._loaded_mtimes: Dict[str, float] = {}
 
     def load_tools(self):
         """Loads all tool modules from the specified directory."""
@@ -24,22 +26,81 @@ class ToolManager:
             return
 
         logger.info(f"Loading tools from '{self.tool_dir}'...")
-        for file in self.tool_dir.glob("*.py"):
-            if file.stem in ("__init__", "base"):
-                continue
+        # Outside debug mode the manifest is authoritative; importing every file found
+        # in the directory is only needed while tool files are being added or edited.
+        if settings.DEBUG or not self._load_from_manifest():
+            self._load_from_files()
+
+        # Rebuilt on next access, so google.generativeai is only imported once it's needed.
+        from tools.base import BaseTool
+        BaseTool._declarations = None
+        logger.info(f"✅ Tool loading complete. {len(self.registry)} tools registered.")
+
+    def _tool_files(self):
+        """Tool module files in the directory, excluding the package's own support modules."""
+        return [file for file in self.tool_dir.glob("*.py") if file.stem not in ("__init__", "base", "_manifest")]
+
+    def _load_from_manifest(self) -> bool:
+        """Imports the tool modules listed in the package's _manifest. Returns False if there is no manifest."""
+        package = self.tool_dir.name
+        try:
+            manifest = importlib.import_module(f"{package}._manifest")
+        except ImportError:
+            return False
+
+        listed = set(manifest.TOOL_MODULES)
+        for module_stem in manifest.TOOL_MODULES:
+            try:
+                importlib.import_module(f"{package}.{module_stem}")
+                logger.info(f"  -> Module '{module_stem}' loaded successfully.")
+            except Exception as e:
+                logger.error(f"  -> Failed to load module {module_stem}: {e}", exc_info=True)
+
+        for file in self._tool_files():
+            if file.stem not in listed:
+                logger.warning(f"  -> Tool module '{file.name}' is not listed in {package}/_manifest.py and was not loaded.")
+        return True
 
+    def _load_from_files(self):
+        """Imports each tool module found in the directory, skipping files unchanged since the last load."""
+        for file in self._tool_files():
             module_name = f"{self.tool_dir.name}.{file.stem}"
             try:
-                if module_name not in sys.modules:
-                    spec = importlib.util.spec_from_file_location(module_name, file)
-                    if spec and spec.loader:
-                        module = importlib.util.module_from_spec(spec)
-                        sys.modules[module_name] = module
-                        spec.loader.exec_module(module)
-                        logger.info(f"  -> Module '{file.name}' loaded successfully.")
-                    else:
-                        logger.warning(f"Could not create module spec for {file.name}")
+                mtime = file.stat().st_mtime
+                if module_name in sys.modules and self._loaded_mtimes.get(module_name) in (None, mtime):
+                    self._loaded_mtimes[module_name] = mtime
+                    continue
+
+                if module_name in sys.modules:
+                    importlib.reload(sys.modules[module_name])
+                else:
+                    # Goes through the regular import system, so cached .pyc files are reused.
+                    importlib.import_module(module_name)
+                self._loaded_mtimes[module_name] = mtime
+                logger.info(f"  -> Module '{file.name}' loaded successfully.")
             except Exception as e:
                 logger.error(f"  -> Failed to load module {file.name}: {e}", exc_info=True)
-        
-        logger.info(f"✅ Tool loading complete. {len(self.registry)} tools registered.")
+
+    def _build_declarations(self) -> Tuple:
+        """Builds the FunctionDeclarations of all AI-enabled tools once, for reuse on every chat turn."""
+        from tools.base import _AI_LEVELS
+        declarations = []
+        for tool_name, tool_class in self.registry.items():
+            if tool_class.META.access_level not in _AI_LEVELS:
+                continue
+            try:
+                declaration = tool_class(db=None, user=None).get_declaration()
+            except Exception as e:
+                logger.error(f"  -> Failed to build declaration for tool '{tool_name}': {e}", exc_info=True)
+                continue
+            if declaration is not None:
+                declarations.append(declaration)
+        return tuple(declarations)
+
+    @property
+    def declarations(self) -> Tuple:
+        """FunctionDeclarations of all AI-enabled tools, as passed to the model."""
+        from tools.base import BaseTool
+        if BaseTool._declarations is None:
+            BaseTool._declarations = self._build_declarations()
+        return BaseTool._declarations
@@ -4,12 +4,18 @@ import sys
 import asyncio
 import logging
 from pathlib import Path
+import orjson
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, Depends
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from typing import Optional
 
+from core.config import logger, settings
+from core.tool_manager import ToolManager
+
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
 # ... (تمام import های دیگر از کد اصلی شما) ...
 # (Bson, Pydantic, backoff, motor, genai, etc.)
 # ... (کلاس‌های Config, ACTION, و مدل‌های داده مثل Workspace, Conversation و...) ...
@@ -19,12 +25,32 @@ from typing import Optional
 # ----------------------------------------------------------------------
 #                      راه اندازی FastAPI
 # ----------------------------------------------------------------------
-app = FastAPI(title="Saino Elite V5.1 - FastAPI Edition")
+app = FastAPI(title="Saino Elite V5.1 - FastAPI Edition", default_response_class=ORJSONResponse)
 templates = Jinja2Templates(directory="pages")
 # (در صورت نیاز به فایل‌های استاتیک مثل css/js مشترک می‌توانید این بخش را فعال کنید)
 # app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
+# ----------------------------------------------------------------------
+#                 بارگذاری ابزارها و ثبت صفحات اختصاصی
+# ----------------------------------------------------------------------
+# روترها فقط به META کلاس ابزار وابسته‌اند، پس در زمان import ثبت می‌شوند
+# و منتظر اتصال به دیتابیس نمی‌مانند.
+TOOLS = ToolManager()
+TOOLS.load_tools()
+
+def register_tool_pages():
+    for tool_name, tool_class in TOOLS.registry.items():
+        if not (tool_class.META.has_dedicated_page and tool_class.META.page_endpoint):
+            continue
+        router = tool_class(db=None, user=None).get_page_router()
+        if router:
+            app.include_router(router, prefix=tool_class.META.page_endpoint, tags=[f"Tool: {tool_name}"])
+            logger.info(f"✅ صفحه اختصاصی برای ابزار '{tool_name}' در مسیر '{tool_class.META.page_endpoint}' ثبت شد.")
+
+register_tool_pages()
+
+
 # ----------------------------------------------------------------------
 #                      اتصال به دیتابیس در زمان استارت
 # ----------------------------------------------------------------------
@@ -33,16 +59,6 @@ async def startup_db_client():
     try:
         await DB.connect()
         logger.info("✅ اتصال به MongoDB برای برنامه FastAPI برقرار شد.")
-        # --- ثبت خودکار صفحات ابزارها ---
-        if TOOLS:
-            for tool_name, tool_class in TOOLS.registry.items():
-                instance = tool_class()
-                if instance.META.has_dedicated_page:
-                    router = instance.get_page_router()
-                    if router and instance.META.page_endpoint:
-                        app.include_router(router, prefix=instance.META.page_endpoint, tags=[f"Tool: {tool_name}"])
-                        logger.info(f"✅ صفحه اختصاصی برای ابزار '{tool_name}' در مسیر '{instance.META.page_endpoint}' ثبت شد.")
-
     except Exception as e:
         logger.error(f"❌ اتصال به پایگاه داده در زمان استارت FastAPI ناموفق بود: {e}")
         # در محیط واقعی شاید بخواهید برنامه در این حالت خارج شود
@@ -115,6 +131,42 @@ async def api_login_user(payload: AuthPayload):
 # ----------------------------------------------------------------------
 #                      WebSocket for Real-time Chat
 # ----------------------------------------------------------------------
+# حداکثر زمانی که توکن‌ها قبل از ارسال در یک فریم جمع می‌شوند (ثانیه)
+STREAM_FLUSH_INTERVAL = 0.02
+_STREAM_END = object()
+
+async def _stream_sender(websocket: WebSocket, queue: asyncio.Queue):
+    """Drains streamed tokens from the queue and sends each batch as a single JSON text frame."""
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await queue.get()
+        if item is _STREAM_END:
+            return
+        batch = [item]
+        finished = False
+        deadline = loop.time() + STREAM_FLUSH_INTERVAL
+        while not finished:
+            while not queue.empty() and not finished:
+                item = queue.get_nowait()
+                if item is _STREAM_END:
+                    finished = True
+                else:
+                    batch.append(item)
+            remaining = deadline - loop.time()
+            if finished or remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is _STREAM_END:
+                finished = True
+            else:
+                batch.append(item)
+        await websocket.send_text(orjson.dumps({"token": "".join(batch)}).decode())
+        if finished:
+            return
+
 @app.websocket("/ws/chat")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -136,11 +188,17 @@ async def websocket_endpoint(websocket: WebSocket):
             # تا به جای cl.Message.stream_token از websocket.send_text استفاده کند.
             
             # نمونه پاسخ‌دهی استریم
-            await websocket.send_text("Processing your message...")
+            await websocket.send_text(orjson.dumps({"status": "Processing your message..."}).decode())
+            queue: asyncio.Queue = asyncio.Queue()
+            sender = asyncio.create_task(_stream_sender(websocket, queue))
             response_stream = ["Hello! ", "This ", "is ", "a ", "streamed ", "response."]
-            for chunk in response_stream:
-                await websocket.send_text(chunk)
-                await asyncio.sleep(0.1)
+            try:
+                for chunk in response_stream:
+                    queue.put_nowait(chunk)
+                queue.put_nowait(_STREAM_END)
+                await sender
+            finally:
+                sender.cancel()
 
     except WebSocketDisconnect:
         logger.info("Client disconnected from chat WebSocket.")
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# Tool modules that ToolManager imports outside DEBUG mode, by module name.
+# Add new tool modules here; unlisted files in this directory are reported at startup.
+TOOL_MODULES = (
+    "example_tool",
+)
@@ -2,12 +2,16 @@
 # tools/base.py (Titan Edition)
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Type, Optional, Literal, Callable, List
+from typing import Any, Dict, Type, Optional, Literal, Callable, List, Tuple, TYPE_CHECKING
+from functools import lru_cache
 from pydantic import BaseModel, Field
-from google.generativeai.types import FunctionDeclaration
 from fastapi import APIRouter
 import logging
 
+if TYPE_CHECKING:
+    # Imported lazily in get_declaration(): google.generativeai pulls in gRPC/protobuf.
+    from google.generativeai.types import FunctionDeclaration
+
 logger = logging.getLogger(__name__)
 
 # --- Enums and Metadata Models ---
@@ -18,6 +22,9 @@ class AccessLevel:
     BOTH = "both"
     DISABLED = "disabled"
 
+_AI_LEVELS = frozenset({AccessLevel.AI_ONLY, AccessLevel.BOTH})
+_UI_LEVELS = frozenset({AccessLevel.UI_ONLY, AccessLevel.BOTH})
+
 class ToolMeta(BaseModel):
     name: str = Field(..., description="Unique name of the tool, in snake_case.")
     description: str = Field(..., description="Description for the AI model.")
@@ -33,6 +40,26 @@ class ToolFrontendComponent(BaseModel):
     css: Optional[str] = Field(None, description="Scoped CSS styles for this component.")
     placement: Literal["toolbar", "sidebar_widget", "message_action"] = Field("toolbar", description="Where to render the component.")
 
+@lru_cache(maxsize=None)
+def _schema_for(params_cls: Type[BaseModel]) -> Dict[str, Any]:
+    """JSON schema of a parameters model, generated once per model class."""
+    return params_cls.model_json_schema()
+
+def _no_params(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {}
+
+def _build_param_validator(params_model: Optional[Type[BaseModel]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Builds, once per tool class, the function that turns raw kwargs into validated parameters."""
+    if params_model is None:
+        return _no_params
+
+    def validate(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # Field values are read straight off the instance; model_dump() would walk
+        # the serializer just to build a dict that gets splatted into _execute().
+        return params_model(**kwargs).__dict__
+
+    return validate
+
 # --- Abstract Base Class for All Tools ---
 
 class BaseTool(ABC):
@@ -41,11 +68,15 @@ class BaseTool(ABC):
     Each tool can define its own logic, AI declaration, and even UI components.
     """
     registry: Dict[str, Type["BaseTool"]] = {}
+    # Declarations of all AI-enabled tools, built by ToolManager on first use; None until then.
+    _declarations: Optional[Tuple["FunctionDeclaration", ...]] = None
     META: ToolMeta
+    _validate_params: Callable[[Dict[str, Any]], Dict[str, Any]] = staticmethod(_no_params)
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         if hasattr(cls, 'META') and isinstance(cls.META, ToolMeta):
+            cls._validate_params = staticmethod(_build_param_validator(cls.META.parameters))
             if cls.META.access_level != AccessLevel.DISABLED:
                 cls.registry[cls.META.name] = cls
             else:
@@ -72,14 +103,11 @@ class BaseTool(ABC):
         if not self.META:
             return {"status": "error", "message": "Tool META is not defined."}
 
-        params_model = self.META.parameters
-        validated_params = {}
-        if params_model:
-            try:
-                validated_params = params_model(**kwargs).model_dump()
-            except Exception as e:
-                logger.error(f"Validation error in tool '{self.META.name}': {e}")
-                return {"status": "error", "message": f"Invalid parameters: {e}"}
+        try:
+            validated_params = self._validate_params(kwargs)
+        except Exception as e:
+            logger.error(f"Validation error in tool '{self.META.name}': {e}")
+            return {"status": "error", "message": f"Invalid parameters: {e}"}
         
         try:
             result = await self._execute(stream_callback=stream_callback, **validated_params)
@@ -88,18 +116,29 @@ class BaseTool(ABC):
             logger.exception(f"Error executing tool '{self.META.name}': {e}")
             return {"status": "error", "message": str(e)}
 
-    def get_declaration(self) -> Optional[FunctionDeclaration]:
-        """Generates the FunctionDeclaration for Google's Generative AI."""
-        if self.META.access_level not in [AccessLevel.AI_ONLY, AccessLevel.BOTH]:
-            return None
-        
-        schema = self.META.parameters.model_json_schema() if self.META.parameters else {}
-        
-        return FunctionDeclaration(
-            name=self.META.name,
-            description=self.META.description,
-            parameters=schema
-        )
+    def get_declaration(self) -> Optional["FunctionDeclaration"]:
+        """
+        Generates the FunctionDeclaration for Google's Generative AI.
+        META is fixed at class definition, so the result is cached on the tool class.
+        """
+        cls = type(self)
+        if "_cached_declaration" in cls.__dict__:
+            return cls._cached_declaration
+
+        if self.META.access_level not in _AI_LEVELS:
+            declaration = None
+        else:
+            from google.generativeai.types import FunctionDeclaration
+
+            schema = _schema_for(self.META.parameters) if self.META.parameters else {}
+            declaration = FunctionDeclaration(
+                name=self.META.name,
+                description=self.META.description,
+                parameters=schema
+            )
+
+        cls._cached_declaration = declaration
+        return declaration
 
     def get_frontend_component(self) -> Optional[ToolFrontendComponent]:
         """
@@ -117,8 +156,8 @@ class BaseTool(ABC):
 
     @property
     def is_ai_enabled(self) -> bool:
-        return self.META.access_level in [AccessLevel.AI_ONLY, AccessLevel.BOTH]
+        return self.META.access_level in _AI_LEVELS
 
     @property
     def is_ui_enabled(self) -> bool:
-        return self.META.access_level in [AccessLevel.UI_ONLY, AccessLevel.BOTH]
+        return self.META.access_level in _UI_LEVELS
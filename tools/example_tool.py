@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 from .base import BaseTool, ToolMeta, AccessLevel, ToolFrontendComponent, logger
-from typing import Callable
-import asyncio
+from typing import Callable, Dict
 import platform
 
+# اطلاعات سیستم در طول عمر پردازه تغییر نمی‌کند، پس یک بار محاسبه می‌شود.
+_OS_INFO = f"Operating System: {platform.system()} {platform.release()}"
+_PYTHON_VERSION = f"Python Version: {platform.python_version()}"
+
 class SystemStatusTool(BaseTool):
     """
     یک ابزار نمونه که اطلاعات سیستم را بررسی کرده و یک دکمه در UI نمایش می‌دهد.
@@ -17,15 +20,11 @@ class SystemStatusTool(BaseTool):
     async def _execute(self, stream_callback: Callable[[str], None], **kwargs) -> Dict:
         """منطق اصلی ابزار: اطلاعات سیستم را جمع‌آوری می‌کند."""
         await stream_callback("در حال بررسی سیستم عامل...")
-        await asyncio.sleep(0.5)
-        os_info = f"Operating System: {platform.system()} {platform.release()}"
+        os_info = _OS_INFO
         await stream_callback(f"✅ {os_info}")
         
-        await asyncio.sleep(0.5)
-        
         await stream_callback("در حال بررسی نسخه پایتون...")
-        await asyncio.sleep(0.5)
-        python_version = f"Python Version: {platform.python_version()}"
+        python_version = _PYTHON_VERSION
         await stream_callback(f"✅ {python_version}")
 
         # نتیجه نهایی که به مدل AI برگردانده می‌شود